@@ -27,6 +27,14 @@ REQUIRED_TABLES = (
     "CHICAGO_PUBLIC_SCHOOLS",
     "CHICAGO_CRIME_DATA",
 )
+# Indexed integer community area column added by chicago_data_analysis at ingest.
+JOIN_COLUMN = "COMMUNITY_AREA_INT"
+# Income segment labels assigned in SQL, in display order.
+INCOME_SEGMENTS = (
+    "Low Income Areas",
+    "High Income Areas",
+    "Unknown / Missing Income",
+)
 
 
 def resolve_db_path() -> tuple[Path, list[Path]]:
@@ -69,7 +77,12 @@ DB_PATH, DB_SEARCH_PATHS = resolve_db_path()
 
 
 def has_required_tables(db_path: Path) -> bool:
-    """Return True when the SQLite DB exists and contains all required tables."""
+    """
+    Return True when the SQLite DB exists and contains all required tables.
+
+    Each table must also carry the indexed COMMUNITY_AREA_INT join column; databases
+    built before it was introduced are treated as missing so they get rebuilt.
+    """
     if not db_path.exists():
         return False
 
@@ -82,7 +95,14 @@ def has_required_tables(db_path: Path) -> bool:
               AND name IN ('CENSUS_DATA', 'CHICAGO_PUBLIC_SCHOOLS', 'CHICAGO_CRIME_DATA')
             """
             found = pd.read_sql_query(query, conn)["name"].tolist()
-        return set(found) == set(REQUIRED_TABLES)
+            if set(found) != set(REQUIRED_TABLES):
+                return False
+
+            for table in REQUIRED_TABLES:
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if JOIN_COLUMN not in columns:
+                    return False
+        return True
     except Exception:
         return False
 
@@ -160,17 +180,31 @@ def configure_page() -> None:
     )
 
 
+@st.cache_resource(show_spinner=False)
+def get_connection() -> sqlite3.Connection:
+    """
+    Open one shared read connection to FinalDB.db for the app process.
+
+    Reusing the connection keeps SQLite's page cache warm across queries, and
+    memory-mapped I/O lets reads come straight from the OS page cache.
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA cache_size = -200000")
+    return conn
+
+
 @st.cache_data(show_spinner=False)
-def run_query(query: str) -> pd.DataFrame:
+def run_query(query: str, params: tuple = ()) -> pd.DataFrame:
     """
     Execute a SQL query against FinalDB.db and return a DataFrame.
 
     The function is cached to keep the dashboard responsive while users interact
-    with filters and tabs.
+    with filters and tabs. Values for `?` placeholders are passed via `params`
+    so filter selections become part of the cache key.
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            return pd.read_sql_query(query, conn)
+        return pd.read_sql_query(query, get_connection(), params=params)
     except Exception as exc:  # pragma: no cover - defensive UI guard
         st.error(f"Database query failed: {exc}")
         return pd.DataFrame()
@@ -185,72 +219,144 @@ def load_socioeducation_dataset() -> pd.DataFrame:
     - LEFT JOIN ensures communities remain visible even if school rows are missing.
     - NULL checks avoid introducing bad values into averages.
     - Empty/aggregate census rows are filtered out.
+    - Numeric columns are CAST in SQL so pandas receives numeric dtypes directly.
     """
     query = """
     SELECT
-        CAST(c.COMMUNITY_AREA_NUMBER AS INTEGER) AS community_area_number,
+        c.COMMUNITY_AREA_INT AS community_area_number,
         c.COMMUNITY_AREA_NAME AS community_area_name,
-        c.HARDSHIP_INDEX AS hardship_index,
-        c.PERCENT_HOUSEHOLDS_BELOW_POVERTY AS poverty_rate,
-        AVG(CASE WHEN s.SAFETY_SCORE IS NOT NULL THEN s.SAFETY_SCORE END) AS avg_safety_score,
+        CAST(c.HARDSHIP_INDEX AS REAL) AS hardship_index,
+        CAST(c.PERCENT_HOUSEHOLDS_BELOW_POVERTY AS REAL) AS poverty_rate,
+        CAST(c.PER_CAPITA_INCOME AS REAL) AS per_capita_income,
+        AVG(CASE WHEN s.SAFETY_SCORE IS NOT NULL THEN CAST(s.SAFETY_SCORE AS REAL) END) AS avg_safety_score,
         COUNT(s.School_ID) AS school_count
     FROM CENSUS_DATA c
     LEFT JOIN CHICAGO_PUBLIC_SCHOOLS s
-        ON CAST(s.COMMUNITY_AREA_NUMBER AS INTEGER) = CAST(c.COMMUNITY_AREA_NUMBER AS INTEGER)
-    WHERE c.COMMUNITY_AREA_NUMBER IS NOT NULL
+        ON s.COMMUNITY_AREA_INT = c.COMMUNITY_AREA_INT
+    WHERE c.COMMUNITY_AREA_INT IS NOT NULL
       AND TRIM(COALESCE(c.COMMUNITY_AREA_NAME, '')) <> ''
     GROUP BY
-        CAST(c.COMMUNITY_AREA_NUMBER AS INTEGER),
+        c.COMMUNITY_AREA_INT,
         c.COMMUNITY_AREA_NAME,
         c.HARDSHIP_INDEX,
-        c.PERCENT_HOUSEHOLDS_BELOW_POVERTY
+        c.PERCENT_HOUSEHOLDS_BELOW_POVERTY,
+        c.PER_CAPITA_INCOME
     ORDER BY community_area_number
     """
 
+    return run_query(query)
+
+
+@st.cache_data(show_spinner=False)
+def load_income_bounds() -> tuple[int, int, int]:
+    """
+    Return (min, max, median) per capita income for the income split slider.
+
+    Bounds depend only on census data, so they are computed once per cache
+    lifetime rather than on every sidebar interaction.
+    """
+    incomes = load_socioeducation_dataset()["per_capita_income"].to_numpy(dtype=float)
+    incomes = incomes[~np.isnan(incomes)]
+    if incomes.size == 0:
+        return 0, 10000, 5000
+
+    min_income = int(incomes.min())
+    max_income = int(incomes.max())
+    default_income = int(np.median(incomes))
+    if min_income == max_income:
+        max_income = min_income + 1
+    return min_income, max_income, default_income
+
+
+@st.cache_data(show_spinner=False)
+def load_community_options() -> list[str]:
+    """Return the distinct community area names available for the sidebar filter."""
+    query = """
+    SELECT DISTINCT COMMUNITY_AREA_NAME AS community_area_name
+    FROM CENSUS_DATA
+    WHERE COMMUNITY_AREA_INT IS NOT NULL
+      AND TRIM(COALESCE(COMMUNITY_AREA_NAME, '')) <> ''
+      AND COMMUNITY_AREA_NAME <> 'Unknown'
+    ORDER BY community_area_name
+    """
     df = run_query(query)
-    numeric_cols = [
-        "community_area_number",
-        "hardship_index",
-        "poverty_rate",
-        "avg_safety_score",
-        "school_count",
-    ]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
+    return df["community_area_name"].tolist() if not df.empty else []
 
 
 @st.cache_data(show_spinner=False)
-def load_crime_dataset() -> pd.DataFrame:
+def load_crime_type_options() -> list[str]:
+    """Return the distinct crime types available for the sidebar filter."""
+    query = """
+    SELECT DISTINCT COALESCE(PRIMARY_TYPE, 'UNKNOWN') AS primary_type
+    FROM CHICAGO_CRIME_DATA
+    WHERE COMMUNITY_AREA_INT IS NOT NULL
+    ORDER BY primary_type
     """
-    Build a crime dataset enriched with socioeconomic context by community area.
+    df = run_query(query)
+    return df["primary_type"].tolist() if not df.empty else []
+
+
+@st.cache_data(show_spinner=False)
+def load_crime_aggregates(
+    communities: tuple[str, ...], crime_types: tuple[str, ...], income_threshold: int
+) -> pd.DataFrame:
+    """
+    Build crime counts per community, income segment, and crime type.
 
     SQL logic:
-    - COALESCE keeps categorical fields usable for charts.
-    - LEFT JOIN preserves crime rows even when census linkage is incomplete.
-    - Explicit numeric conversion happens in pandas for safer downstream math.
+    - Filters and the low/high income split run inside SQLite, so pandas only
+      receives one row per (community, segment, crime type) combination.
+    - LEFT JOIN preserves crime rows even when census linkage is incomplete;
+      those land in the "Unknown / Missing Income" segment.
+    - Empty filter tuples mean "no filter"; tuple arguments keep the cache
+      keyed on the exact selection.
     """
-    query = """
+    conditions: list[str] = []
+    params: list[object] = [income_threshold]
+
+    if communities:
+        conditions.append(f"community_area_name IN ({', '.join('?' * len(communities))})")
+        params.extend(communities)
+    if crime_types:
+        conditions.append(f"primary_type IN ({', '.join('?' * len(crime_types))})")
+        params.extend(crime_types)
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
     SELECT
-        cr.ID AS crime_id,
-        COALESCE(cr.CASE_NUMBER, 'N/A') AS case_number,
-        COALESCE(cr.PRIMARY_TYPE, 'UNKNOWN') AS primary_type,
-        COALESCE(cr.DESCRIPTION, 'No description') AS description,
-        CAST(cr.COMMUNITY_AREA_NUMBER AS INTEGER) AS community_area_number,
-        COALESCE(c.COMMUNITY_AREA_NAME, 'Unknown') AS community_area_name,
-        c.PER_CAPITA_INCOME AS per_capita_income,
-        c.PERCENT_HOUSEHOLDS_BELOW_POVERTY AS poverty_rate,
-        c.HARDSHIP_INDEX AS hardship_index,
-        cr.YEAR AS crime_year
-    FROM CHICAGO_CRIME_DATA cr
-    LEFT JOIN CENSUS_DATA c
-        ON CAST(cr.COMMUNITY_AREA_NUMBER AS INTEGER) = CAST(c.COMMUNITY_AREA_NUMBER AS INTEGER)
-    WHERE cr.COMMUNITY_AREA_NUMBER IS NOT NULL
+        community_area_name,
+        income_segment,
+        primary_type,
+        COUNT(*) AS crime_count
+    FROM (
+        SELECT
+            COALESCE(c.COMMUNITY_AREA_NAME, 'Unknown') AS community_area_name,
+            COALESCE(cr.PRIMARY_TYPE, 'UNKNOWN') AS primary_type,
+            CASE
+                WHEN c.PER_CAPITA_INCOME IS NULL THEN 'Unknown / Missing Income'
+                WHEN c.PER_CAPITA_INCOME <= ? THEN 'Low Income Areas'
+                ELSE 'High Income Areas'
+            END AS income_segment
+        FROM CHICAGO_CRIME_DATA cr
+        LEFT JOIN CENSUS_DATA c
+            ON cr.COMMUNITY_AREA_INT = c.COMMUNITY_AREA_INT
+        WHERE cr.COMMUNITY_AREA_INT IS NOT NULL
+    )
+    {where_clause}
+    GROUP BY community_area_name, income_segment, primary_type
     """
 
-    df = run_query(query)
-    for col in ["community_area_number", "per_capita_income", "poverty_rate", "hardship_index"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = run_query(query, tuple(params))
+    if not df.empty:
+        # Category dtypes turn isin/groupby on these repeated labels into integer
+        # code operations; fixed segment categories also keep a stable order.
+        df = df.astype(
+            {
+                "community_area_name": "category",
+                "primary_type": "category",
+                "income_segment": pd.CategoricalDtype(INCOME_SEGMENTS),
+            }
+        )
     return df
 
 
@@ -262,37 +368,26 @@ def format_metric(value: float | int | None, decimals: int = 1, suffix: str = ""
 
 
 def build_sidebar_filters(
-    socio_df: pd.DataFrame, crime_df: pd.DataFrame
+    community_options: Sequence[str],
+    crime_type_options: Sequence[str],
+    income_bounds: tuple[int, int, int],
 ) -> tuple[Sequence[str], Sequence[str], int, int]:
     """Render sidebar controls and return selected filters."""
     st.sidebar.header("Dashboard Filters")
 
-    community_options = sorted(
-        [area for area in socio_df["community_area_name"].dropna().unique().tolist() if area != "Unknown"]
-    )
     selected_communities = st.sidebar.multiselect(
         "Community Area",
         options=community_options,
         help="Filter both tabs to one or more Chicago communities.",
     )
 
-    crime_type_options = sorted(crime_df["primary_type"].dropna().unique().tolist())
     selected_crime_types = st.sidebar.multiselect(
         "Crime Type",
         options=crime_type_options,
         help="Optional filter applied to the Crime Hotspots tab.",
     )
 
-    income_series = pd.to_numeric(crime_df["per_capita_income"], errors="coerce").dropna()
-    if income_series.empty:
-        min_income, max_income, default_income = 0, 10000, 5000
-    else:
-        min_income = int(income_series.min())
-        max_income = int(income_series.max())
-        default_income = int(income_series.median())
-        if min_income == max_income:
-            max_income = min_income + 1
-
+    min_income, max_income, default_income = income_bounds
     income_threshold = st.sidebar.slider(
         "Income Split Threshold (Per Capita Income)",
         min_value=min_income,
@@ -313,46 +408,40 @@ def build_sidebar_filters(
     return selected_communities, selected_crime_types, income_threshold, top_n
 
 
-def apply_filters(
-    socio_df: pd.DataFrame,
-    crime_df: pd.DataFrame,
-    selected_communities: Sequence[str],
-    selected_crime_types: Sequence[str],
-) -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Apply sidebar selections to both base datasets."""
-    filtered_socio = socio_df.copy()
-    filtered_crime = crime_df.copy()
-
-    if selected_communities:
-        filtered_socio = filtered_socio[
-            filtered_socio["community_area_name"].isin(selected_communities)
-        ]
-        filtered_crime = filtered_crime[
-            filtered_crime["community_area_name"].isin(selected_communities)
-        ]
+def apply_filters(socio_df: pd.DataFrame, selected_communities: Sequence[str]) -> pd.DataFrame:
+    """
+    Apply sidebar selections to the socioeconomic dataset.
 
-    if selected_crime_types:
-        filtered_crime = filtered_crime[filtered_crime["primary_type"].isin(selected_crime_types)]
+    Crime filters are applied in SQL by `load_crime_aggregates`.
+    """
+    if not selected_communities:
+        return socio_df
 
-    return filtered_socio, filtered_crime
+    # A boolean mask already yields a new frame, so no defensive copy is needed.
+    return socio_df.loc[socio_df["community_area_name"].isin(selected_communities)]
 
 
-def render_kpis(socio_df: pd.DataFrame, crime_df: pd.DataFrame, income_threshold: int) -> None:
+def render_kpis(socio_df: pd.DataFrame, crime_df: pd.DataFrame) -> None:
     """Render dashboard KPI cards at the top of the page."""
-    known_income_crime = crime_df[crime_df["per_capita_income"].notna()].copy()
     low_income_share = np.nan
-    if not known_income_crime.empty:
-        low_income_share = (
-            100.0
-            * (known_income_crime["per_capita_income"] <= income_threshold).sum()
-            / len(known_income_crime)
+    if not crime_df.empty:
+        # One weighted pass over the segment codes yields incident totals per segment.
+        low_total, high_total, _unknown_total = np.bincount(
+            crime_df["income_segment"].cat.codes.to_numpy(),
+            weights=crime_df["crime_count"].to_numpy(),
+            minlength=len(INCOME_SEGMENTS),
         )
+        if low_total + high_total:
+            low_income_share = 100.0 * low_total / (low_total + high_total)
+
+    # Column-wise mean computes all three averages in a single call.
+    averages = socio_df[["hardship_index", "poverty_rate", "avg_safety_score"]].mean()
 
     kpi_cols = st.columns(5)
     kpi_cols[0].metric("Communities in View", format_metric(socio_df["community_area_name"].nunique(), 0))
-    kpi_cols[1].metric("Avg Hardship Index", format_metric(socio_df["hardship_index"].mean(), 1))
-    kpi_cols[2].metric("Avg Poverty Rate", format_metric(socio_df["poverty_rate"].mean(), 1, "%"))
-    kpi_cols[3].metric("Avg School Safety", format_metric(socio_df["avg_safety_score"].mean(), 1))
+    kpi_cols[1].metric("Avg Hardship Index", format_metric(averages["hardship_index"], 1))
+    kpi_cols[2].metric("Avg Poverty Rate", format_metric(averages["poverty_rate"], 1, "%"))
+    kpi_cols[3].metric("Avg School Safety", format_metric(averages["avg_safety_score"], 1))
     kpi_cols[4].metric("Low-Income Crime Share", format_metric(low_income_share, 1, "%"))
 
 
@@ -363,8 +452,7 @@ def render_socioeducation_tab(socio_df: pd.DataFrame) -> None:
         "Analyze how hardship and poverty levels align with average school safety scores at community level."
     )
 
-    viz_df = socio_df.copy()
-    valid_df = viz_df.dropna(subset=["hardship_index", "poverty_rate", "avg_safety_score"])
+    valid_df = socio_df.dropna(subset=["hardship_index", "poverty_rate", "avg_safety_score"])
 
     if valid_df.empty:
         st.warning("No data available for this view after filters. Try broadening your filters.")
@@ -373,6 +461,7 @@ def render_socioeducation_tab(socio_df: pd.DataFrame) -> None:
     col1, col2 = st.columns(2)
 
     # Scatter plot: Poverty vs safety, colored by hardship and sized by number of schools.
+    # WebGL rendering keeps zoom/restyle responsive as the point count grows.
     scatter_fig = px.scatter(
         valid_df,
         x="poverty_rate",
@@ -388,6 +477,7 @@ def render_socioeducation_tab(socio_df: pd.DataFrame) -> None:
             "school_count": "Schools",
         },
         title="Community Poverty vs. School Safety (Bubble Size = School Count)",
+        render_mode="webgl",
     )
     scatter_fig.update_layout(margin=dict(l=20, r=20, t=60, b=20))
     col1.plotly_chart(scatter_fig, width="stretch")
@@ -432,9 +522,7 @@ def render_socioeducation_tab(socio_df: pd.DataFrame) -> None:
     )
 
 
-def render_crime_hotspots_tab(
-    crime_df: pd.DataFrame, income_threshold: int, top_n: int
-) -> None:
+def render_crime_hotspots_tab(crime_df: pd.DataFrame, top_n: int) -> None:
     """Render the Crime Hotspots analytics tab."""
     st.subheader("Crime Hotspots")
     st.caption("Compare crime type concentration between low-income and high-income communities.")
@@ -443,21 +531,9 @@ def render_crime_hotspots_tab(
         st.warning("No crime data available for this view after filters.")
         return
 
-    working_df = crime_df.copy()
-
-    # Create an income segment for side-by-side comparisons.
-    working_df["income_segment"] = np.where(
-        working_df["per_capita_income"].isna(),
-        "Unknown / Missing Income",
-        np.where(
-            working_df["per_capita_income"] <= income_threshold,
-            "Low Income Areas",
-            "High Income Areas",
-        ),
-    )
-
-    compare_df = working_df[
-        working_df["income_segment"].isin(["Low Income Areas", "High Income Areas"])
+    # Income segments are assigned in SQL by load_crime_aggregates.
+    compare_df = crime_df[
+        crime_df["income_segment"].isin(["Low Income Areas", "High Income Areas"])
     ]
 
     if compare_df.empty:
@@ -467,16 +543,17 @@ def render_crime_hotspots_tab(
         return
 
     grouped = (
-        compare_df.groupby(["income_segment", "primary_type"], dropna=False)
-        .size()
-        .reset_index(name="crime_count")
+        compare_df.groupby(
+            ["income_segment", "primary_type"], dropna=False, observed=True
+        )["crime_count"]
+        .sum()
+        .reset_index()
     )
 
     top_crimes = (
-        grouped.groupby("primary_type", dropna=False)["crime_count"]
+        grouped.groupby("primary_type", dropna=False, observed=True)["crime_count"]
         .sum()
-        .sort_values(ascending=False)
-        .head(top_n)
+        .nlargest(top_n)
         .index
     )
     grouped_top = grouped[grouped["primary_type"].isin(top_crimes)]
@@ -505,10 +582,11 @@ def render_crime_hotspots_tab(
     col1.plotly_chart(bar_fig, width="stretch")
 
     # Donut chart: overall share of incidents by low/high income segment.
+    # Roll up from the segment/type totals rather than re-scanning compare_df.
     segment_share = (
-        compare_df.groupby("income_segment", dropna=False)
-        .size()
-        .reset_index(name="crime_count")
+        grouped.groupby("income_segment", dropna=False, observed=True)["crime_count"]
+        .sum()
+        .reset_index()
     )
     pie_fig = px.pie(
         segment_share,
@@ -525,16 +603,20 @@ def render_crime_hotspots_tab(
     pie_fig.update_layout(margin=dict(l=20, r=20, t=60, b=20))
     col2.plotly_chart(pie_fig, width="stretch")
 
-    unknown_income_count = (working_df["income_segment"] == "Unknown / Missing Income").sum()
+    unknown_income_count = crime_df.loc[
+        crime_df["income_segment"] == "Unknown / Missing Income", "crime_count"
+    ].sum()
     if unknown_income_count:
         st.caption(
             f"{unknown_income_count} crime record(s) were excluded from low/high segmentation due to missing income data."
         )
 
     hotspots = (
-        compare_df.groupby(["community_area_name", "income_segment"], dropna=False)
-        .size()
-        .reset_index(name="crime_count")
+        compare_df.groupby(
+            ["community_area_name", "income_segment"], dropna=False, observed=True
+        )["crime_count"]
+        .sum()
+        .reset_index()
         .sort_values("crime_count", ascending=False)
         .head(15)
         .rename(
@@ -582,9 +664,9 @@ def main() -> None:
             st.success("First-run data setup complete. Dashboard is ready.")
 
     socio_df = load_socioeducation_dataset()
-    crime_df = load_crime_dataset()
+    crime_type_options = load_crime_type_options()
 
-    if socio_df.empty or crime_df.empty:
+    if socio_df.empty or not crime_type_options:
         st.error(
             "One or more required datasets are empty in `FinalDB.db`. Rebuild the database and try again."
         )
@@ -595,22 +677,22 @@ def main() -> None:
         selected_crime_types,
         income_threshold,
         top_n,
-    ) = build_sidebar_filters(socio_df, crime_df)
+    ) = build_sidebar_filters(load_community_options(), crime_type_options, load_income_bounds())
 
-    filtered_socio, filtered_crime = apply_filters(
-        socio_df,
-        crime_df,
-        selected_communities,
-        selected_crime_types,
+    filtered_socio = apply_filters(socio_df, selected_communities)
+    filtered_crime = load_crime_aggregates(
+        tuple(selected_communities),
+        tuple(selected_crime_types),
+        income_threshold,
     )
 
-    render_kpis(filtered_socio, filtered_crime, income_threshold)
+    render_kpis(filtered_socio, filtered_crime)
 
     tab1, tab2 = st.tabs(["Socioeconomic & Education", "Crime Hotspots"])
     with tab1:
         render_socioeducation_tab(filtered_socio)
     with tab2:
-        render_crime_hotspots_tab(filtered_crime, income_threshold, top_n)
+        render_crime_hotspots_tab(filtered_crime, top_n)
 
     st.caption(
         f"Data source: `{DB_PATH}` tables `CENSUS_DATA`, `CHICAGO_PUBLIC_SCHOOLS`, and `CHICAGO_CRIME_DATA`."
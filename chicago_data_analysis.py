@@ -14,13 +14,145 @@ Author: Data Analysis Project
 """
 
 import pandas as pd
+# Also exposed as pandas.errors.DatabaseError on pandas >= 1.5
+from pandas.io.sql import DatabaseError as PandasDatabaseError
 import sqlite3
 from sqlite3 import Error
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from functools import partial
+import io
 import os
 import ssl
 import urllib.request
 
 
+# Crime columns referenced by the analysis queries and the dashboard.
+CRIME_CSV_COLUMNS = [
+    "ID",
+    "CASE_NUMBER",
+    "DATE",
+    "PRIMARY_TYPE",
+    "DESCRIPTION",
+    "LOCATION_DESCRIPTION",
+    "COMMUNITY_AREA_NUMBER",
+    "YEAR",
+]
+# Explicit dtypes for the text columns keep repeated strings compact. Numeric
+# columns are left to pandas' inference so one malformed cell (e.g. an ID of
+# "JA123") is stored as-is instead of aborting the whole load.
+CRIME_CSV_DTYPES = {
+    "CASE_NUMBER": "string",
+    "DATE": "string",
+    "PRIMARY_TYPE": "category",
+    "DESCRIPTION": "category",
+    "LOCATION_DESCRIPTION": "category",
+}
+# Rows parsed and written to SQLite per batch when loading crime data.
+CRIME_CHUNK_SIZE = 100_000
+
+
+# Problem 8 asks for the most crime-prone community area number and problem 10
+# for its name; one query answers both so CHICAGO_CRIME_DATA is scanned once.
+# The name is looked up with a scalar subquery against CENSUS_DATA and is NULL
+# when the area has no census row.
+TOP_CRIME_AREA_QUERY = """
+WITH AREA_CRIME_COUNTS AS (
+    SELECT COMMUNITY_AREA_INT AS COMMUNITY_AREA_NUMBER, COUNT(*) as CRIME_COUNT
+    FROM CHICAGO_CRIME_DATA
+    WHERE COMMUNITY_AREA_INT IS NOT NULL
+    GROUP BY COMMUNITY_AREA_INT
+    ORDER BY CRIME_COUNT DESC
+    LIMIT 1
+)
+SELECT
+    a.COMMUNITY_AREA_NUMBER,
+    a.CRIME_COUNT,
+    (
+        SELECT c.COMMUNITY_AREA_NAME
+        FROM CENSUS_DATA c
+        WHERE c.COMMUNITY_AREA_INT = a.COMMUNITY_AREA_NUMBER
+    ) AS COMMUNITY_AREA_NAME
+FROM AREA_CRIME_COUNTS a;
+"""
+
+# Analysis problems as (number, title, query, columns to display or None for all).
+ANALYSIS_PROBLEMS = [
+    # Problem 1: Total number of crimes
+    (1, "Find the total number of crimes recorded", """
+    SELECT COUNT(*) as TOTAL_CRIMES
+    FROM CHICAGO_CRIME_DATA;
+    """, None),
+    
+    # Problem 2: Community areas with per capita income < 11000
+    (2, "Community areas with per capita income < $11,000", """
+    SELECT COMMUNITY_AREA_NUMBER, COMMUNITY_AREA_NAME, PER_CAPITA_INCOME
+    FROM CENSUS_DATA
+    WHERE PER_CAPITA_INCOME < 11000
+    ORDER BY PER_CAPITA_INCOME DESC;
+    """, None),
+    
+    # Problem 3: Case numbers for crimes involving minors
+    (3, "Crime case numbers involving minors", """
+    SELECT DISTINCT CASE_NUMBER
+    FROM CHICAGO_CRIME_DATA
+    WHERE DESCRIPTION LIKE '%MINOR%'
+    ORDER BY CASE_NUMBER;
+    """, None),
+    
+    # Problem 4: Kidnapping crimes involving a child
+    (4, "Kidnapping crimes involving a child", """
+    SELECT CASE_NUMBER, ID, DESCRIPTION
+    FROM CHICAGO_CRIME_DATA
+    WHERE PRIMARY_TYPE = 'KIDNAPPING'
+    AND DESCRIPTION LIKE '%CHILD%'
+    ORDER BY CASE_NUMBER;
+    """, None),
+    
+    # Problem 5: Types of crimes at schools (no repetitions)
+    (5, "Types of crimes recorded at schools", """
+    SELECT DISTINCT PRIMARY_TYPE
+    FROM CHICAGO_CRIME_DATA
+    WHERE LOCATION_DESCRIPTION LIKE '%SCHOOL%'
+    ORDER BY PRIMARY_TYPE;
+    """, None),
+    
+    # Problem 6: Type of schools and average safety score
+    (6, "School types with average safety scores", """
+    SELECT "Elementary, Middle, or High School" as SCHOOL_TYPE, AVG(SAFETY_SCORE) as AVG_SAFETY_SCORE
+    FROM CHICAGO_PUBLIC_SCHOOLS
+    WHERE SAFETY_SCORE IS NOT NULL
+    GROUP BY "Elementary, Middle, or High School"
+    ORDER BY AVG_SAFETY_SCORE DESC;
+    """, None),
+    
+    # Problem 7: Top 5 community areas with highest poverty percentage
+    (7, "Top 5 community areas with highest poverty rate", """
+    SELECT COMMUNITY_AREA_NUMBER, COMMUNITY_AREA_NAME, PERCENT_HOUSEHOLDS_BELOW_POVERTY
+    FROM CENSUS_DATA
+    ORDER BY PERCENT_HOUSEHOLDS_BELOW_POVERTY DESC
+    LIMIT 5;
+    """, None),
+    
+    # Problem 8: Most crime-prone community area
+    (8, "Most crime-prone community area", TOP_CRIME_AREA_QUERY,
+     ("COMMUNITY_AREA_NUMBER", "CRIME_COUNT")),
+    
+    # Problem 9: Community area with highest hardship index (using subquery)
+    (9, "Community area with highest hardship index (subquery)", """
+    SELECT COMMUNITY_AREA_NAME
+    FROM CENSUS_DATA
+    WHERE HARDSHIP_INDEX = (
+        SELECT MAX(HARDSHIP_INDEX)
+        FROM CENSUS_DATA
+    );
+    """, None),
+    
+    # Problem 10: Community area with most crimes (using subquery)
+    (10, "Community area with most crimes (subquery)", TOP_CRIME_AREA_QUERY,
+     ("COMMUNITY_AREA_NAME",)),
+]
+
+
 class ChicagoDataAnalysis:
     """Handle Chicago data loading and SQL analysis."""
     
@@ -51,6 +183,16 @@ class ChicagoDataAnalysis:
         try:
             self.conn = sqlite3.connect(self.db_name)
             self.cursor = self.conn.cursor()
+            # page_size only applies to a new database and must precede WAL
+            self.conn.execute("PRAGMA page_size = 8192")
+            # WAL + NORMAL sync cuts fsyncs during bulk loads and lets the
+            # dashboard read while the database is being written
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            # ~200 MB page cache and in-memory temp tables for GROUP BY/ORDER BY
+            self.conn.execute("PRAGMA cache_size = -200000")
+            self.conn.execute("PRAGMA temp_store = MEMORY")
+            self.conn.execute("PRAGMA mmap_size = 1073741824")
             print(f"✓ Connected to database: {self.db_name}")
         except Error as e:
             print(f"✗ Error connecting to database: {e}")
@@ -72,88 +214,131 @@ class ChicagoDataAnalysis:
         schools_url = "https://cf-courses-data.s3.us.cloud-object-storage.appdomain.cloud/IBMDeveloperSkillsNetwork-DB0201EN-SkillsNetwork/labs/FinalModule_Coursera_V5/data/ChicagoPublicSchools.csv"
         crime_url = "https://cf-courses-data.s3.us.cloud-object-storage.appdomain.cloud/IBMDeveloperSkillsNetwork-DB0201EN-SkillsNetwork/labs/FinalModule_Coursera_V5/data/ChicagoCrimeData.csv"
         
+        # The downloads are independent and network bound, so run them in
+        # parallel. For URLs pandas fetches the whole body when the reader is
+        # created, so the crime download overlaps too; its rows are still
+        # parsed lazily in chunks while storing.
+        print("\n→ Downloading Chicago Census, Public Schools and Crime Data...")
+        read_table = partial(pd.read_csv, on_bad_lines='skip')
+        executor = ThreadPoolExecutor(max_workers=3)
         try:
-            # Load Census Data
-            print("\n→ Loading Chicago Census Data...")
-            census_df = pd.read_csv(census_url, on_bad_lines='skip')
-            print(f"  ✓ Loaded {len(census_df)} records")
-            
-            # Load Schools Data
-            print("→ Loading Chicago Public Schools Data...")
-            schools_df = pd.read_csv(schools_url, on_bad_lines='skip')
-            print(f"  ✓ Loaded {len(schools_df)} records")
-            
-            # Load Crime Data
-            print("→ Loading Chicago Crime Data...")
-            crime_df = pd.read_csv(crime_url, on_bad_lines='skip')
-            print(f"  ✓ Loaded {len(crime_df)} records")
+            census_future = executor.submit(self.read_dataset, census_url, read_table)
+            schools_future = executor.submit(self.read_dataset, schools_url, read_table)
+            crime_future = executor.submit(self.read_dataset, crime_url, self.read_crime_chunks)
+            futures = [census_future, schools_future, crime_future]
             
-            # Store dataframes to database
-            self.store_data_to_db(census_df, schools_df, crime_df)
+            # Stop at the first download that fails, whichever it is, rather
+            # than waiting on the ones submitted before it
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in futures:
+                if future in done and future.exception() is not None:
+                    raise future.exception()
             
+            census_df = census_future.result()
+            print(f"  ✓ Loaded {len(census_df)} census records")
+            schools_df = schools_future.result()
+            print(f"  ✓ Loaded {len(schools_df)} school records")
+            crime_chunks = crime_future.result()
         except Exception as e:
             print(f"✗ Error loading data: {e}")
+            return
+        finally:
+            # Give up on downloads still in flight after a failure instead of
+            # waiting for them; on success every future is already done.
+            executor.shutdown(wait=False)
+        
+        # Store dataframes to database
+        self.store_data_to_db(census_df, schools_df, crime_chunks)
+        
+    def read_dataset(self, url, reader):
+        """Read one dataset with `reader`, retrying once with the SSL bypass.
+        
+        Each dataset falls back on its own, so a failed download never forces
+        the others to be fetched again.
+        """
+        try:
+            return reader(url)
+        except Exception as e:
+            print(f"✗ Error loading {url.rsplit('/', 1)[-1]}: {e}")
             print("  Trying alternative method with SSL bypass...")
-            try:
-                # Try with SSL context bypass
-                import urllib.request
-                import ssl
-                
-                # Create an SSL context that doesn't verify certificates
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-                
-                # Load with SSL bypass
-                print("\n→ Loading Chicago Census Data (SSL bypass)...")
-                with urllib.request.urlopen(census_url, context=ssl_context) as response:
-                    census_df = pd.read_csv(response, on_bad_lines='skip')
-                print(f"  ✓ Loaded {len(census_df)} records")
-                
-                print("→ Loading Chicago Public Schools Data (SSL bypass)...")
-                with urllib.request.urlopen(schools_url, context=ssl_context) as response:
-                    schools_df = pd.read_csv(response, on_bad_lines='skip')
-                print(f"  ✓ Loaded {len(schools_df)} records")
-                
-                print("→ Loading Chicago Crime Data (SSL bypass)...")
-                with urllib.request.urlopen(crime_url, context=ssl_context) as response:
-                    crime_df = pd.read_csv(response, on_bad_lines='skip')
-                print(f"  ✓ Loaded {len(crime_df)} records")
-                
-                # Store dataframes to database
-                self.store_data_to_db(census_df, schools_df, crime_df)
-                
-            except Exception as e2:
-                print(f"✗ Error with SSL bypass: {e2}")
+            with urllib.request.urlopen(url, context=self.ssl_context) as response:
+                return reader(io.BytesIO(response.read()))
             
-    def store_data_to_db(self, census_df, schools_df, crime_df):
-        """Store dataframes into SQLite database tables."""
+    def read_crime_chunks(self, source):
+        """Return an iterator of crime DataFrames limited to the columns we query."""
+        return pd.read_csv(
+            source,
+            on_bad_lines='skip',
+            usecols=CRIME_CSV_COLUMNS,
+            dtype=CRIME_CSV_DTYPES,
+            chunksize=CRIME_CHUNK_SIZE,
+        )
+        
+    def store_data_to_db(self, census_df, schools_df, crime_chunks):
+        """Store dataframes into SQLite database tables.
+        
+        Crime data arrives as an iterable of DataFrame chunks; the first chunk
+        replaces the table and the rest are appended.
+        """
         print("\n→ Creating database tables...")
         
         try:
             # Store Census Data
             census_df.to_sql("CENSUS_DATA", self.conn, if_exists="replace", index=False)
+            self.index_community_area("CENSUS_DATA", "idx_census_cca")
             print("  ✓ Created CENSUS_DATA table")
             
             # Store Schools Data
             schools_df.to_sql("CHICAGO_PUBLIC_SCHOOLS", self.conn, if_exists="replace", index=False)
+            self.index_community_area("CHICAGO_PUBLIC_SCHOOLS", "idx_schools_cca")
             print("  ✓ Created CHICAGO_PUBLIC_SCHOOLS table")
             
             # Store Crime Data
-            crime_df.to_sql("CHICAGO_CRIME_DATA", self.conn, if_exists="replace", index=False)
-            print("  ✓ Created CHICAGO_CRIME_DATA table")
+            crime_rows = 0
+            for chunk_num, crime_chunk in enumerate(crime_chunks):
+                crime_chunk.to_sql(
+                    "CHICAGO_CRIME_DATA",
+                    self.conn,
+                    if_exists="replace" if chunk_num == 0 else "append",
+                    index=False,
+                )
+                crime_rows += len(crime_chunk)
+            self.index_community_area("CHICAGO_CRIME_DATA", "idx_crime_cca")
+            print(f"  ✓ Created CHICAGO_CRIME_DATA table ({crime_rows} records)")
             
             self.conn.commit()
             print("\n✓ All tables created successfully!")
             
-        except Error as e:
+        except (Error, PandasDatabaseError, ValueError) as e:
+            # to_sql wraps insert failures in pandas' DatabaseError, and crime
+            # chunks are parsed inside the loop above, so CSV parse errors
+            # (ValueError, including pandas' ParserError) also surface here
             print(f"✗ Error storing data: {e}")
             
+    def index_community_area(self, table_name, index_name):
+        """Add an indexed integer copy of COMMUNITY_AREA_NUMBER for joins.
+        
+        The CSV columns load as REAL or TEXT depending on missing values, so
+        joins would otherwise need CAST(... AS INTEGER), which cannot use an index.
+        """
+        self.cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN COMMUNITY_AREA_INT INTEGER")
+        self.cursor.execute(
+            f"UPDATE {table_name} "
+            f"SET COMMUNITY_AREA_INT = CAST(COMMUNITY_AREA_NUMBER AS INTEGER) "
+            f"WHERE COMMUNITY_AREA_NUMBER IS NOT NULL"
+        )
+        self.cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}(COMMUNITY_AREA_INT)"
+        )
+        
     def execute_query(self, query_num, query):
         """Execute a single SQL query and display results."""
         try:
-            result = pd.read_sql_query(query, self.conn)
-            return result
+            # sqlite3 caches prepared statements per connection; building the
+            # frame from fetchall() skips read_sql_query's per-call overhead.
+            cursor = self.conn.execute(query)
+            columns = [description[0] for description in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
         except Error as e:
             print(f"✗ Error executing query {query_num}: {e}")
             return None
@@ -170,120 +355,24 @@ class ChicagoDataAnalysis:
             print("No results found or error occurred.")
             
     def run_analysis(self):
-        """Run all 10 analysis problems."""
+        """Run all 10 analysis problems.
+        
+        Problems that share a query (8 and 10) execute it once and display
+        different columns of the same result. Rows whose displayed columns are
+        all NULL are dropped, as a standalone query filtering on them would.
+        """
         print("\n" + "="*70)
         print("RUNNING SQL ANALYSIS PROBLEMS")
         print("="*70)
         
-        # Problem 1: Total number of crimes
-        query1 = """
-        SELECT COUNT(*) as TOTAL_CRIMES
-        FROM CHICAGO_CRIME_DATA;
-        """
-        result1 = self.execute_query(1, query1)
-        self.display_results(1, "Find the total number of crimes recorded", result1)
-        
-        # Problem 2: Community areas with per capita income < 11000
-        query2 = """
-        SELECT COMMUNITY_AREA_NUMBER, COMMUNITY_AREA_NAME, PER_CAPITA_INCOME
-        FROM CENSUS_DATA
-        WHERE PER_CAPITA_INCOME < 11000
-        ORDER BY PER_CAPITA_INCOME DESC;
-        """
-        result2 = self.execute_query(2, query2)
-        self.display_results(2, "Community areas with per capita income < $11,000", result2)
-        
-        # Problem 3: Case numbers for crimes involving minors
-        query3 = """
-        SELECT DISTINCT CASE_NUMBER
-        FROM CHICAGO_CRIME_DATA
-        WHERE DESCRIPTION LIKE '%MINOR%'
-        ORDER BY CASE_NUMBER;
-        """
-        result3 = self.execute_query(3, query3)
-        self.display_results(3, "Crime case numbers involving minors", result3)
-        
-        # Problem 4: Kidnapping crimes involving a child
-        query4 = """
-        SELECT CASE_NUMBER, ID, DESCRIPTION
-        FROM CHICAGO_CRIME_DATA
-        WHERE PRIMARY_TYPE = 'KIDNAPPING'
-        AND DESCRIPTION LIKE '%CHILD%'
-        ORDER BY CASE_NUMBER;
-        """
-        result4 = self.execute_query(4, query4)
-        self.display_results(4, "Kidnapping crimes involving a child", result4)
-        
-        # Problem 5: Types of crimes at schools (no repetitions)
-        query5 = """
-        SELECT DISTINCT PRIMARY_TYPE
-        FROM CHICAGO_CRIME_DATA
-        WHERE LOCATION_DESCRIPTION LIKE '%SCHOOL%'
-        ORDER BY PRIMARY_TYPE;
-        """
-        result5 = self.execute_query(5, query5)
-        self.display_results(5, "Types of crimes recorded at schools", result5)
-        
-        # Problem 6: Type of schools and average safety score
-        query6 = """
-        SELECT "Elementary, Middle, or High School" as SCHOOL_TYPE, AVG(SAFETY_SCORE) as AVG_SAFETY_SCORE
-        FROM CHICAGO_PUBLIC_SCHOOLS
-        WHERE SAFETY_SCORE IS NOT NULL
-        GROUP BY "Elementary, Middle, or High School"
-        ORDER BY AVG_SAFETY_SCORE DESC;
-        """
-        result6 = self.execute_query(6, query6)
-        self.display_results(6, "School types with average safety scores", result6)
-        
-        # Problem 7: Top 5 community areas with highest poverty percentage
-        query7 = """
-        SELECT COMMUNITY_AREA_NUMBER, COMMUNITY_AREA_NAME, PERCENT_HOUSEHOLDS_BELOW_POVERTY
-        FROM CENSUS_DATA
-        ORDER BY PERCENT_HOUSEHOLDS_BELOW_POVERTY DESC
-        LIMIT 5;
-        """
-        result7 = self.execute_query(7, query7)
-        self.display_results(7, "Top 5 community areas with highest poverty rate", result7)
-        
-        # Problem 8: Most crime-prone community area
-        query8 = """
-        SELECT COMMUNITY_AREA_NUMBER, COUNT(*) as CRIME_COUNT
-        FROM CHICAGO_CRIME_DATA
-        WHERE COMMUNITY_AREA_NUMBER IS NOT NULL
-        GROUP BY COMMUNITY_AREA_NUMBER
-        ORDER BY CRIME_COUNT DESC
-        LIMIT 1;
-        """
-        result8 = self.execute_query(8, query8)
-        self.display_results(8, "Most crime-prone community area", result8)
-        
-        # Problem 9: Community area with highest hardship index (using subquery)
-        query9 = """
-        SELECT COMMUNITY_AREA_NAME
-        FROM CENSUS_DATA
-        WHERE HARDSHIP_INDEX = (
-            SELECT MAX(HARDSHIP_INDEX)
-            FROM CENSUS_DATA
-        );
-        """
-        result9 = self.execute_query(9, query9)
-        self.display_results(9, "Community area with highest hardship index (subquery)", result9)
-        
-        # Problem 10: Community area with most crimes (using subquery)
-        query10 = """
-        SELECT COMMUNITY_AREA_NAME
-        FROM CENSUS_DATA
-        WHERE COMMUNITY_AREA_NUMBER = (
-            SELECT COMMUNITY_AREA_NUMBER
-            FROM CHICAGO_CRIME_DATA
-            WHERE COMMUNITY_AREA_NUMBER IS NOT NULL
-            GROUP BY COMMUNITY_AREA_NUMBER
-            ORDER BY COUNT(*) DESC
-            LIMIT 1
-        );
-        """
-        result10 = self.execute_query(10, query10)
-        self.display_results(10, "Community area with most crimes (subquery)", result10)
+        results = {}
+        for problem_num, title, query, columns in ANALYSIS_PROBLEMS:
+            if query not in results:
+                results[query] = self.execute_query(problem_num, query)
+            result = results[query]
+            if result is not None and columns is not None:
+                result = result[list(columns)].dropna(how="all")
+            self.display_results(problem_num, title, result)
         
         print("\n" + "="*70)
         print("ANALYSIS COMPLETE")